@@ -0,0 +1,316 @@
+# -*- coding: utf-8 -*-
+"""대용량 이미지 디렉토리에 대한 LeNet5 batch 추론 CLI
+
+lenet5.py에서 저장한 TorchScript checkpoint를 불러와 PNG/JPEG 이미지를 분류하고
+결과를 CSV로 기록합니다.
+
+    python batch_predict.py lenet5.pt images/ predictions.csv --workers 8
+
+- 이미지 decode와 32x32 resize는 process pool에서 수행하고, 결과는 공유 메모리
+  batch slot에 직접 기록되어 model process(메인 process)로 복사 없이 전달됩니다.
+- 동시에 처리 중인 batch 수는 slot 개수로 제한되므로 메모리 사용량이 일정합니다.
+- manifest 파일에 완료된 이미지 수와 CSV 크기를 기록하므로 중단 후 같은 명령으로
+  다시 실행하면 이어서 처리합니다. 입력 디렉토리나 이미지 목록이 바뀐 경우에는
+  이어서 처리하지 않고 오류를 냅니다.
+"""
+
+import argparse
+import csv
+import hashlib
+import json
+import os
+import sys
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from multiprocessing import RawArray, get_context
+
+import numpy as np
+from PIL import Image
+
+# torch는 predict()에서만 import: spawn된 decode worker는 이 module을 다시 import하므로
+# top-level에서 import하면 worker마다 torch의 시작 시간과 메모리가 추가됨
+
+IMG_SIZE = 32
+IMG_EXTENSIONS = ('.png', '.jpg', '.jpeg')
+CSV_HEADER = ['path', 'label', 'confidence', 'error']
+
+# UTF-8이 아닌 파일 이름(os.walk가 surrogate escape로 반환)도 원래 byte 그대로 기록
+CSV_ENCODING = 'utf-8'
+CSV_ERRORS = 'surrogateescape'
+
+# worker process에서 사용하는 공유 메모리 batch slot
+_slots = None
+
+def list_images(root):
+    '''
+    root 아래의 모든 이미지 경로를 정렬된 순서로 반환하는 함수
+    (resume이 가능하도록 실행마다 같은 순서를 보장)
+    '''
+
+    paths = []
+    for dirpath, dirnames, filenames in os.walk(root):
+        dirnames.sort()
+        for filename in sorted(filenames):
+            if filename.lower().endswith(IMG_EXTENSIONS):
+                paths.append(os.path.join(dirpath, filename))
+    return paths
+
+def _init_worker(buffer, n_slots, batch_size):
+    '''
+    worker process에서 공유 메모리 buffer를 numpy 배열로 연결하는 함수
+    '''
+
+    global _slots
+    _slots = np.frombuffer(buffer, dtype=np.uint8).reshape(n_slots, batch_size, IMG_SIZE, IMG_SIZE)
+
+def _decode_batch(slot, paths):
+    '''
+    이미지들을 grayscale 32x32로 decode해 공유 메모리 slot에 기록하는 함수
+    실패한 이미지는 error message를, 성공한 이미지는 None을 반환
+    '''
+
+    errors = []
+    for i, path in enumerate(paths):
+        try:
+            with Image.open(path) as img:
+                img = img.convert('L').resize((IMG_SIZE, IMG_SIZE), Image.BILINEAR)
+                _slots[slot, i] = np.asarray(img, dtype=np.uint8)
+            errors.append(None)
+        except Exception as e:
+            _slots[slot, i] = 0
+            errors.append(f'{type(e).__name__}: {e}')
+    return errors
+
+def hash_paths(paths):
+    '''
+    이미지 경로 목록의 SHA-256 hash를 계산하는 함수 (resume 시 목록이 같은지 확인용)
+    '''
+
+    h = hashlib.sha256()
+    for path in paths:
+        h.update(path.encode(CSV_ENCODING, CSV_ERRORS))
+        h.update(b'\0')
+    return h.hexdigest()
+
+def load_manifest(manifest_path):
+    '''
+    manifest를 읽는 함수 (없으면 None)
+    '''
+
+    if not os.path.exists(manifest_path):
+        return None
+    with open(manifest_path) as f:
+        return json.load(f)
+
+def check_manifest(manifest, input_dir, paths, paths_hash, output_path):
+    '''
+    manifest가 현재 실행과 같은 입력에 대한 것인지 확인하고 완료된 이미지 수와
+    그 시점의 CSV 크기(bytes)를 반환하는 함수
+    다르면 결과가 어긋나지 않도록 ValueError를 발생
+    '''
+
+    missing = {'input_dir', 'n_total', 'paths_sha256', 'n_done', 'last_path', 'csv_bytes'} - set(manifest)
+    if missing:
+        raise ValueError(f'manifest is missing {sorted(missing)}; delete it to start over')
+    if manifest['input_dir'] != input_dir:
+        raise ValueError(f"manifest was written for input directory {manifest['input_dir']!r}, "
+                         f'not {input_dir!r}')
+    if manifest['n_total'] != len(paths) or manifest['paths_sha256'] != paths_hash:
+        raise ValueError(f"the images in {input_dir!r} changed since the manifest was written "
+                         f"({manifest['n_total']} images then, {len(paths)} now)")
+
+    n_done = manifest['n_done']
+    if n_done > 0 and manifest['last_path'] != paths[n_done - 1]:
+        raise ValueError(f"last completed image {manifest['last_path']!r} does not match "
+                         f'image {n_done} of the current listing')
+
+    if not os.path.exists(output_path) or os.path.getsize(output_path) < manifest['csv_bytes']:
+        raise ValueError(f'{output_path!r} is missing or shorter than recorded in the manifest')
+
+    return n_done, manifest['csv_bytes']
+
+def save_manifest(manifest_path, input_dir, paths, paths_hash, n_done, csv_bytes):
+    '''
+    manifest를 임시 파일에 쓴 뒤 교체해 중단 시에도 깨지지 않도록 저장하는 함수
+    '''
+
+    manifest = {'input_dir': input_dir,
+                'n_total': len(paths),
+                'paths_sha256': paths_hash,
+                'n_done': n_done,
+                'last_path': paths[n_done - 1] if n_done > 0 else None,
+                'csv_bytes': csv_bytes}
+
+    tmp_path = manifest_path + '.tmp'
+    with open(tmp_path, 'w') as f:
+        json.dump(manifest, f)
+    os.replace(tmp_path, manifest_path)
+
+def open_output(output_path, csv_bytes):
+    '''
+    CSV 출력 파일을 열고 manifest에 기록된 위치 이후의 미완료 행을 잘라내는 함수
+    '''
+
+    if csv_bytes == 0:
+        f = open(output_path, 'w', newline='', encoding=CSV_ENCODING, errors=CSV_ERRORS)
+        csv.writer(f).writerow(CSV_HEADER)
+        return f
+
+    os.truncate(output_path, csv_bytes)
+    return open(output_path, 'a', newline='', encoding=CSV_ENCODING, errors=CSV_ERRORS)
+
+def predict(checkpoint, input_dir, output_path, manifest_path=None, batch_size=1024,
+            n_workers=None, n_threads=None, n_slots=None, device=None, report_every=10.0):
+    '''
+    input_dir의 모든 이미지를 분류해 output_path(CSV)에 기록하는 함수
+    n_workers개의 decode process와 n_threads개 thread의 model process가 CPU를 나눠 사용
+    (기본값: worker는 CPU 수 - 1, model은 남은 CPU, 최소 1개씩)
+    '''
+
+    import torch
+
+    if manifest_path is None:
+        manifest_path = output_path + '.manifest.json'
+    if device is None:
+        device = 'cuda' if torch.cuda.is_available() else 'cpu'
+    n_cpus = os.cpu_count() or 1
+    if n_workers is None:
+        n_workers = max(1, n_cpus - 1)
+    if n_threads is None:
+        n_threads = max(1, n_cpus - n_workers)
+    if n_slots is None:
+        # worker가 decode하는 동안 model이 추론할 수 있도록 worker 수보다 여유 있게 설정
+        n_slots = n_workers + 2
+
+    input_dir = os.path.abspath(input_dir)
+    paths = list_images(input_dir)
+    paths_hash = hash_paths(paths)
+    n_total = len(paths)
+
+    n_done, csv_bytes = 0, 0
+    manifest = load_manifest(manifest_path)
+    if manifest is not None:
+        n_done, csv_bytes = check_manifest(manifest, input_dir, paths, paths_hash, output_path)
+    if n_done > 0:
+        print(f'Resuming from {n_done}/{n_total} images', file=sys.stderr)
+
+    # 모든 batch slot을 담는 공유 메모리 (uint8로 저장해 float32 대비 1/4 크기)
+    buffer = RawArray('B', n_slots * batch_size * IMG_SIZE * IMG_SIZE)
+    slots = np.frombuffer(buffer, dtype=np.uint8).reshape(n_slots, batch_size, IMG_SIZE, IMG_SIZE)
+
+    batches = ((start, paths[start:start + batch_size])
+               for start in range(n_done, n_total, batch_size))
+
+    # CUDA/OpenMP가 초기화된 process를 fork하지 않도록 spawn으로 worker를 만들고,
+    # worker가 비정상 종료되면 멈추지 않고 BrokenProcessPool이 발생하도록 executor 사용
+    executor = ProcessPoolExecutor(n_workers, mp_context=get_context('spawn'),
+                                   initializer=_init_worker,
+                                   initargs=(buffer, n_slots, batch_size))
+
+    # batch 제출 순서대로 처리해 manifest가 항상 연속된 prefix를 가리키도록 함
+    pending = deque()
+
+    def submit(slot):
+        batch = next(batches, None)
+        if batch is not None:
+            start, batch_paths = batch
+            future = executor.submit(_decode_batch, slot, batch_paths)
+            pending.append((slot, start, batch_paths, future))
+
+    out = None
+
+    try:
+        for slot in range(n_slots):
+            submit(slot)
+
+        # torch 기본값(core 수만큼의 thread)을 쓰면 decode worker와 CPU를 두 배로 나눠 쓰게 됨
+        torch.set_num_threads(n_threads)
+        model = torch.jit.load(checkpoint, map_location=device)
+        model.eval()
+
+        out = open_output(output_path, csv_bytes)
+        writer = csv.writer(out)
+
+        start_time = time.perf_counter()
+        last_report = start_time
+        n_new = 0
+
+        with torch.no_grad():
+            while pending:
+                slot, start, batch_paths, future = pending.popleft()
+                try:
+                    errors = future.result()
+                except BrokenProcessPool as e:
+                    raise RuntimeError(f'a decoding worker died while processing '
+                                       f'{batch_paths[0]!r} .. {batch_paths[-1]!r}') from e
+                n = len(batch_paths)
+
+                X = torch.from_numpy(slots[slot, :n]).to(device)
+                X = X.float().div_(255).unsqueeze(1)
+                _, probs = model(X)
+                confidences, labels = torch.max(probs.exp(), 1)
+                confidences, labels = confidences.cpu().tolist(), labels.cpu().tolist()
+
+                # slot의 데이터를 모두 사용했으므로 다음 batch에 재사용
+                submit(slot)
+
+                for path, label, confidence, error in zip(batch_paths, labels, confidences, errors):
+                    if error is None:
+                        writer.writerow([path, label, f'{confidence:.6f}', ''])
+                    else:
+                        writer.writerow([path, '', '', error])
+
+                out.flush()
+                os.fsync(out.fileno())
+                n_done = start + n
+                save_manifest(manifest_path, input_dir, paths, paths_hash,
+                              n_done, os.fstat(out.fileno()).st_size)
+
+                n_new += n
+                now = time.perf_counter()
+                if now - last_report >= report_every or not pending:
+                    last_report = now
+                    print(f'{n_done}/{n_total} images\t'
+                          f'{n_new / (now - start_time):.0f} images/sec',
+                          file=sys.stderr)
+    finally:
+        executor.shutdown(cancel_futures=True)
+        if out is not None:
+            out.close()
+
+    return n_done
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='LeNet5 batch inference over an image directory')
+    parser.add_argument('checkpoint', help='TorchScript checkpoint saved by lenet5.py')
+    parser.add_argument('input_dir', help='directory containing PNG/JPEG images (searched recursively)')
+    parser.add_argument('output', help='CSV file to write predictions to')
+    parser.add_argument('--manifest', default=None,
+                        help='resume manifest path (default: <output>.manifest.json)')
+    parser.add_argument('--batch-size', type=int, default=1024)
+    parser.add_argument('--workers', type=int, default=None,
+                        help='number of decoding processes; together with --threads this should '
+                             'not exceed the CPU count (default: CPU count - 1)')
+    parser.add_argument('--threads', type=int, default=None,
+                        help='number of torch threads in the model process '
+                             '(default: CPU count - workers, at least 1)')
+    parser.add_argument('--slots', type=int, default=None,
+                        help='number of shared-memory batches in flight (default: workers + 2)')
+    parser.add_argument('--device', default=None,
+                        help='torch device for the model (default: cuda if available, else cpu)')
+    parser.add_argument('--report-every', type=float, default=10.0,
+                        help='seconds between progress reports')
+    args = parser.parse_args(argv)
+
+    try:
+        predict(args.checkpoint, args.input_dir, args.output, manifest_path=args.manifest,
+                batch_size=args.batch_size, n_workers=args.workers,
+                n_threads=args.threads, n_slots=args.slots,
+                device=args.device, report_every=args.report_every)
+    except ValueError as e:
+        parser.exit(1, f'{parser.prog}: error: {e}\n')
+
+if __name__ == '__main__':
+    main()
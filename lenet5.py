@@ -11,10 +11,12 @@ import numpy as np
 from datetime import datetime
 import torch
 import torch.nn as nn
-import torch.nn.functional as F
 from torch.utils.data import DataLoader
 from torchvision import datasets, transforms
 import matplotlib.pyplot as plt
+from models import (LeNet5_Tanh, LeNet5_ReLU, LeNet5_LeakyReLU,
+                    LeNet5_ParametricReLU, LeNet5_ExponentialLinearUnit)
+from pruning import pruning_tradeoff, plot_pruning_tradeoff
 DEVICE = 'cuda' if torch.cuda.is_available() else 'cpu'
 
 # parameters
@@ -122,7 +124,7 @@ def validate(valid_loader, model, criterion, device):
 
     return model, epoch_loss
 
-def training_loop(model, criterion, optimizer, train_loader, valid_loader, epochs, device, print_every=1):
+def training_loop(model, criterion, optimizer, train_loader, valid_loader, epochs, device, print_every=1, plot=True):
     '''
     전체 training loop를 정의하는 함수
     '''
@@ -163,7 +165,8 @@ def training_loop(model, criterion, optimizer, train_loader, valid_loader, epoch
                   f'Valid accuracy: {100 * valid_acc:.2f}\t'
                   f'Duration: {duration}')
 
-    plot_losses(train_losses, valid_losses)
+    if plot:
+        plot_losses(train_losses, valid_losses)
 
     return model, optimizer, (train_losses, valid_losses)
 
@@ -201,156 +204,6 @@ for index in range(1, ROW_IMG * N_ROWS + 1):
     plt.imshow(train_dataset.data[index], cmap='gray_r')
 fig.suptitle('MNIST Dataset - preview');
 
-class LeNet5_Tanh(nn.Module):
-
-    def __init__(self, n_classes):
-        super(LeNet5_Tanh, self).__init__()
-
-        self.feature_extractor = nn.Sequential(
-            nn.Conv2d(in_channels=1, out_channels=6, kernel_size=5, stride=1),
-            nn.Tanh(),
-            nn.AvgPool2d(kernel_size=2),
-            nn.Conv2d(in_channels=6, out_channels=16, kernel_size=5, stride=1),
-            nn.Tanh(),
-            nn.AvgPool2d(kernel_size=2),
-            nn.Conv2d(in_channels=16, out_channels=120, kernel_size=5, stride=1),
-            nn.Tanh()
-        )
-
-        self.classifier = nn.Sequential(
-            nn.Linear(in_features=120, out_features=84),
-            nn.Tanh(),
-            nn.Linear(in_features=84, out_features=n_classes),
-        )
-
-
-    def forward(self, x):
-        x = self.feature_extractor(x)
-        x = torch.flatten(x, 1)
-        logits = self.classifier(x)
-        probs = F.log_softmax(logits, dim=1)
-        return logits, probs
-
-class LeNet5_ReLU(nn.Module):
-
-    def __init__(self, n_classes):
-        super(LeNet5_ReLU, self).__init__()
-
-        self.feature_extractor = nn.Sequential(
-            nn.Conv2d(in_channels=1, out_channels=6, kernel_size=5, stride=1),
-            nn.ReLU(),
-            nn.AvgPool2d(kernel_size=2),
-            nn.Conv2d(in_channels=6, out_channels=16, kernel_size=5, stride=1),
-            nn.ReLU(),
-            nn.AvgPool2d(kernel_size=2),
-            nn.Conv2d(in_channels=16, out_channels=120, kernel_size=5, stride=1),
-            nn.ReLU()
-        )
-
-        self.classifier = nn.Sequential(
-            nn.Linear(in_features=120, out_features=84),
-            nn.Tanh(),
-            nn.Linear(in_features=84, out_features=n_classes),
-        )
-
-
-    def forward(self, x):
-        x = self.feature_extractor(x)
-        x = torch.flatten(x, 1)
-        logits = self.classifier(x)
-        probs = F.log_softmax(logits, dim=1)
-        return logits, probs
-
-class LeNet5_LeakyReLU(nn.Module):
-
-    def __init__(self, n_classes):
-        super(LeNet5_LeakyReLU, self).__init__()
-
-        self.feature_extractor = nn.Sequential(
-            nn.Conv2d(in_channels=1, out_channels=6, kernel_size=5, stride=1),
-            nn.LeakyReLU(0.1),
-            nn.AvgPool2d(kernel_size=2),
-            nn.Conv2d(in_channels=6, out_channels=16, kernel_size=5, stride=1),
-            nn.LeakyReLU(0.1),
-            nn.AvgPool2d(kernel_size=2),
-            nn.Conv2d(in_channels=16, out_channels=120, kernel_size=5, stride=1),
-            nn.LeakyReLU(0.1)
-        )
-
-        self.classifier = nn.Sequential(
-            nn.Linear(in_features=120, out_features=84),
-            nn.Tanh(),
-            nn.Linear(in_features=84, out_features=n_classes),
-        )
-
-
-    def forward(self, x):
-        x = self.feature_extractor(x)
-        x = torch.flatten(x, 1)
-        logits = self.classifier(x)
-        probs = F.log_softmax(logits, dim=1)
-        return logits, probs
-
-class LeNet5_ParametricReLU(nn.Module):
-
-    def __init__(self, n_classes):
-        super(LeNet5_ParametricReLU, self).__init__()
-
-        self.feature_extractor = nn.Sequential(
-            nn.Conv2d(in_channels=1, out_channels=6, kernel_size=5, stride=1),
-            nn.PReLU(),
-            nn.AvgPool2d(kernel_size=2),
-            nn.Conv2d(in_channels=6, out_channels=16, kernel_size=5, stride=1),
-            nn.PReLU(),
-            nn.AvgPool2d(kernel_size=2),
-            nn.Conv2d(in_channels=16, out_channels=120, kernel_size=5, stride=1),
-            nn.PReLU()
-        )
-
-        self.classifier = nn.Sequential(
-            nn.Linear(in_features=120, out_features=84),
-            nn.Tanh(),
-            nn.Linear(in_features=84, out_features=n_classes),
-        )
-
-
-    def forward(self, x):
-        x = self.feature_extractor(x)
-        x = torch.flatten(x, 1)
-        logits = self.classifier(x)
-        probs = F.log_softmax(logits, dim=1)
-        return logits, probs
-
-class LeNet5_ExponentialLinearUnit(nn.Module):
-
-    def __init__(self, n_classes):
-        super(LeNet5_ExponentialLinearUnit, self).__init__()
-
-        self.feature_extractor = nn.Sequential(
-            nn.Conv2d(in_channels=1, out_channels=6, kernel_size=5, stride=1),
-            nn.ELU(),
-            nn.AvgPool2d(kernel_size=2),
-            nn.Conv2d(in_channels=6, out_channels=16, kernel_size=5, stride=1),
-            nn.ELU(),
-            nn.AvgPool2d(kernel_size=2),
-            nn.Conv2d(in_channels=16, out_channels=120, kernel_size=5, stride=1),
-            nn.ELU(),
-        )
-
-        self.classifier = nn.Sequential(
-            nn.Linear(in_features=120, out_features=84),
-            nn.Tanh(),
-            nn.Linear(in_features=84, out_features=n_classes),
-        )
-
-
-    def forward(self, x):
-        x = self.feature_extractor(x)
-        x = torch.flatten(x, 1)
-        logits = self.classifier(x)
-        probs = F.log_softmax(logits, dim=1)
-        return logits, probs
-
 torch.manual_seed(RANDOM_SEED)
 
 model = LeNet5_Tanh(N_CLASSES).to(DEVICE)
@@ -684,4 +537,32 @@ for i in range(len(incorrect_samples)):
     axs[row, col].set_title(f'Predicted: {predicted_label}, True: {true_label}')
     axs[row, col].axis('off')
 plt.tight_layout()
-plt.show()
\ No newline at end of file
+plt.show()
+
+# 마지막으로 학습한 model에 대해 structured pruning의 속도/정확도 trade-off 측정
+# fine-tuning과 정확도는 DEVICE에서, 추론 속도는 CPU에서 batch 크기별로 측정
+PRUNING_RATIOS = [0.0, 0.25, 0.5, 0.75]
+FINE_TUNE_EPOCHS = 2
+BENCH_BATCH_SIZES = [1, BATCH_SIZE, 1024]
+
+def fine_tune(pruned):
+    optimizer = torch.optim.Adam(pruned.parameters(), lr=LEARNING_RATE)
+    pruned, _, _ = training_loop(pruned, criterion, optimizer, train_loader,
+                                 valid_loader, FINE_TUNE_EPOCHS, DEVICE,
+                                 print_every=FINE_TUNE_EPOCHS, plot=False)
+    return pruned
+
+torch.manual_seed(RANDOM_SEED)
+
+pruning_results = pruning_tradeoff(model, PRUNING_RATIOS, valid_loader, DEVICE,
+                                   evaluate=lambda m: get_accuracy(m, valid_loader, device=DEVICE),
+                                   fine_tune=fine_tune, method='activation',
+                                   bench_batch_sizes=BENCH_BATCH_SIZES)
+for batch_size in BENCH_BATCH_SIZES:
+    plot_pruning_tradeoff(pruning_results, batch_size)
+
+# batch_predict.py에서 model class 없이 불러올 수 있도록 TorchScript checkpoint로 저장
+model.eval()
+example = torch.zeros(1, 1, IMG_SIZE, IMG_SIZE, device=DEVICE)
+traced_model = torch.jit.trace(model, example)
+traced_model.save('lenet5.pt')
@@ -0,0 +1,258 @@
+# -*- coding: utf-8 -*-
+"""LeNet5 model의 structured channel pruning과 추론 속도 측정
+
+models.py의 어떤 LeNet5_* model이든 conv channel(6, 16, 120)과 hidden unit(84)을
+중요도 순으로 제거해 더 작은 dense model을 만들고, pruning 비율별 추론 속도와
+정확도를 비교합니다.
+
+    from models import LeNet5_ReLU
+    from pruning import prune_lenet5
+
+    model = LeNet5_ReLU(10)
+    model.load_state_dict(torch.load('lenet5_relu.pth'))
+    pruned = prune_lenet5(model, 0.5)
+"""
+
+import copy
+import time
+
+import numpy as np
+import torch
+import torch.nn as nn
+from torch.utils.data import DataLoader
+import matplotlib.pyplot as plt
+
+def get_channel_importance(model, method='l1', data_loader=None, device='cpu'):
+    '''
+    LeNet5 model의 각 conv channel과 hidden unit의 중요도를 계산하는 함수
+    method='l1'이면 weight의 L1 norm, method='activation'이면 data_loader에 대한 평균 |activation|을 사용
+    '''
+
+    # 중요도를 계산할 layer: feature_extractor의 conv 3개와 classifier의 hidden layer
+    layers = [model.feature_extractor[0], model.feature_extractor[3],
+              model.feature_extractor[6], model.classifier[0]]
+
+    if method == 'l1':
+        return [layer.weight.detach().abs().flatten(1).sum(dim=1).cpu() for layer in layers]
+
+    if method != 'activation':
+        raise ValueError(f'Unknown importance method: {method}')
+    if data_loader is None:
+        raise ValueError("method='activation' requires a data_loader")
+
+    # 각 activation 출력에 hook을 걸어 channel별 |activation|의 합 기록하기
+    activations = [model.feature_extractor[1], model.feature_extractor[4],
+                   model.feature_extractor[7], model.classifier[1]]
+    sums = [0 for _ in activations]
+    n = 0
+
+    def make_hook(i):
+        def hook(module, inputs, output):
+            dims = [0] + list(range(2, output.dim()))
+            sums[i] = sums[i] + output.abs().sum(dim=dims)
+        return hook
+
+    handles = [act.register_forward_hook(make_hook(i)) for i, act in enumerate(activations)]
+
+    try:
+        with torch.no_grad():
+            model.eval()
+            for X, _ in data_loader:
+                X = X.to(device)
+                model(X)
+                n += X.size(0)
+    finally:
+        for handle in handles:
+            handle.remove()
+
+    if n == 0:
+        raise ValueError('data_loader yielded no samples')
+
+    return [(s / n).cpu() for s in sums]
+
+def select_channels(importances, ratio):
+    '''
+    layer별로 중요도가 높은 channel의 index를 원래 순서대로 반환하는 함수 (layer마다 최소 1개)
+    '''
+
+    if not 0 <= ratio < 1:
+        raise ValueError(f'ratio must be in [0, 1), got {ratio}')
+
+    keep = []
+    for importance in importances:
+        n_keep = max(1, int(round(importance.numel() * (1 - ratio))))
+        keep.append(torch.topk(importance, n_keep).indices.sort().values)
+    return keep
+
+def _prune_layer(layer, make_layer, out_idx=None, in_idx=None):
+    '''
+    Conv2d/Linear layer에서 선택된 output/input channel만 남긴 새 layer를 만드는 함수
+    make_layer(in_features, out_features, bias)는 같은 종류의 빈 layer를 만드는 함수
+    '''
+
+    weight = layer.weight.detach()
+    bias = layer.bias.detach() if layer.bias is not None else None
+    if out_idx is not None:
+        weight = weight[out_idx]
+        bias = bias[out_idx] if bias is not None else None
+    if in_idx is not None:
+        weight = weight[:, in_idx]
+
+    new_layer = make_layer(weight.size(1), weight.size(0), bias is not None).to(weight.device)
+    new_layer.weight.data.copy_(weight)
+    if bias is not None:
+        new_layer.bias.data.copy_(bias)
+    return new_layer
+
+def _make_conv(conv):
+    return lambda in_channels, out_channels, bias: nn.Conv2d(
+        in_channels=in_channels, out_channels=out_channels, kernel_size=conv.kernel_size,
+        stride=conv.stride, padding=conv.padding, bias=bias)
+
+def _make_linear(in_features, out_features, bias):
+    return nn.Linear(in_features=in_features, out_features=out_features, bias=bias)
+
+def prune_lenet5(model, ratio, method='l1', data_loader=None, device='cpu'):
+    '''
+    LeNet5 model의 conv channel(6, 16, 120)과 hidden unit(84)을 ratio만큼 제거해
+    더 작은 dense model을 만드는 함수 (원본 model은 변경하지 않음)
+    '''
+
+    importances = get_channel_importance(model, method, data_loader, device)
+    keep = select_channels(importances, ratio)
+
+    pruned = copy.deepcopy(model)
+    fe, clf = pruned.feature_extractor, pruned.classifier
+    keep = [idx.to(fe[0].weight.device) for idx in keep]
+
+    fe[0] = _prune_layer(fe[0], _make_conv(fe[0]), out_idx=keep[0])
+    fe[3] = _prune_layer(fe[3], _make_conv(fe[3]), out_idx=keep[1], in_idx=keep[0])
+    fe[6] = _prune_layer(fe[6], _make_conv(fe[6]), out_idx=keep[2], in_idx=keep[1])
+    # 마지막 conv의 출력은 1x1이므로 flatten 후 index가 channel index와 같음
+    clf[0] = _prune_layer(clf[0], _make_linear, out_idx=keep[3], in_idx=keep[2])
+    clf[2] = _prune_layer(clf[2], _make_linear, in_idx=keep[3])
+
+    return pruned
+
+def _cycle(data_loader):
+    '''
+    data_loader를 끝없이 반복하는 generator (빈 data_loader면 바로 종료)
+    '''
+
+    while True:
+        empty = True
+        for batch in data_loader:
+            empty = False
+            yield batch
+        if empty:
+            return
+
+def get_throughput(model, data_loader, device='cpu', min_batches=20, min_time=0.5, n_warmup=2):
+    '''
+    data_loader에 대한 model의 추론 속도(images/sec)를 측정하는 함수
+    data loading 시간은 제외하고 순전파 시간만 측정하며, 처음 n_warmup번의 순전파
+    (메모리 할당, kernel 선택 등)는 측정에서 제외
+    batch 크기와 관계없이 최소 min_batches개, min_time초 이상 측정 (필요하면 data_loader 반복)
+    '''
+
+    if min_batches < 1:
+        raise ValueError(f'min_batches must be at least 1, got {min_batches}')
+
+    n = 0
+    n_timed = 0
+    elapsed = 0.0
+
+    with torch.no_grad():
+        model.eval()
+        for X, _ in _cycle(data_loader):
+            X = X.to(device)
+            if n_timed == 0:
+                for _ in range(n_warmup):
+                    model(X)
+
+            if device == 'cuda':
+                torch.cuda.synchronize()
+            start_time = time.perf_counter()
+            model(X)
+            if device == 'cuda':
+                torch.cuda.synchronize()
+            elapsed += time.perf_counter() - start_time
+            n += X.size(0)
+            n_timed += 1
+
+            if n_timed >= min_batches and elapsed >= min_time:
+                break
+
+    if n == 0:
+        raise ValueError('data_loader yielded no samples')
+
+    return n / elapsed
+
+def pruning_tradeoff(model, ratios, valid_loader, device, evaluate, fine_tune=None,
+                     method='l1', bench_batch_sizes=(1, 32), min_batches=20, min_time=0.5):
+    '''
+    여러 pruning 비율에 대해 CPU 추론 속도(images/sec)와 정확도를 측정하는 함수
+    evaluate(model)는 정확도를, fine_tune(model)은 fine-tuning한 model을 반환하는 함수
+    (ratio 0은 fine-tuning하지 않고 원본 그대로 사용)
+    추론 속도는 bench_batch_sizes의 각 batch 크기에 대해 model을 CPU로 복사해 측정
+    '''
+
+    bench_loaders = {batch_size: DataLoader(dataset=valid_loader.dataset,
+                                            batch_size=batch_size,
+                                            shuffle=False)
+                     for batch_size in bench_batch_sizes}
+
+    results = []
+
+    for ratio in ratios:
+        pruned = prune_lenet5(model, ratio, method=method,
+                              data_loader=valid_loader, device=device)
+
+        if fine_tune is not None and ratio > 0:
+            pruned = fine_tune(pruned)
+
+        n_params = sum(p.numel() for p in pruned.parameters())
+        accuracy = float(evaluate(pruned))
+
+        cpu_model = copy.deepcopy(pruned).to('cpu')
+        throughput = {batch_size: get_throughput(cpu_model, loader, 'cpu',
+                                                 min_batches=min_batches, min_time=min_time)
+                      for batch_size, loader in bench_loaders.items()}
+
+        print(f'Pruning ratio: {ratio:.2f}\t'
+              f'Params: {n_params}\t'
+              f'Valid accuracy: {100 * accuracy:.2f}\t'
+              + '\t'.join(f'Images/sec (batch {batch_size}): {ips:.0f}'
+                          for batch_size, ips in throughput.items()))
+
+        results.append({'ratio': ratio, 'model': pruned, 'n_params': n_params,
+                        'accuracy': accuracy, 'throughput': throughput})
+
+    return results
+
+def plot_pruning_tradeoff(results, batch_size):
+    '''
+    pruning 결과의 batch_size에서의 images/sec - accuracy 곡선과 Pareto front를 시각화하는 함수
+    '''
+
+    throughputs = np.array([r['throughput'][batch_size] for r in results])
+    accuracies = np.array([r['accuracy'] for r in results])
+
+    # 다른 점보다 빠르면서 정확도도 높은 점이 없는 경우 Pareto front에 포함
+    pareto = [i for i in range(len(results))
+              if not any(throughputs[j] >= throughputs[i] and accuracies[j] >= accuracies[i]
+                         and (throughputs[j], accuracies[j]) != (throughputs[i], accuracies[i])
+                         for j in range(len(results)))]
+    pareto = sorted(pareto, key=lambda i: throughputs[i])
+
+    fig, ax = plt.subplots(figsize = (8, 4.5))
+
+    ax.scatter(throughputs, 100 * accuracies, color='blue', label='Pruned models')
+    ax.plot(throughputs[pareto], 100 * accuracies[pareto], color='red', label='Pareto front')
+    for r in results:
+        ax.annotate(f"{r['ratio']:.2f}", (r['throughput'][batch_size], 100 * r['accuracy']))
+    ax.set(title=f"Pruning trade-off (CPU, batch size {batch_size})",
+            xlabel='Images/sec',
+            ylabel='Valid accuracy (%)')
+    ax.legend()
+    fig.show()
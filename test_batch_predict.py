@@ -0,0 +1,137 @@
+import csv
+import os
+import subprocess
+import sys
+
+import numpy as np
+import pytest
+import torch
+import torch.nn as nn
+import torch.nn.functional as F
+from PIL import Image
+
+import batch_predict
+
+
+class StubModel(nn.Module):
+    '''
+    평균 밝기로 class를 정하는 LeNet5 대용 model (LeNet5와 같은 (logits, probs) 출력)
+    '''
+
+    def forward(self, x):
+        brightness = x.mean(dim=(1, 2, 3), keepdim=True)
+        logits = -(brightness * 9 - torch.arange(10, dtype=x.dtype)).abs().flatten(1)
+        return logits, F.log_softmax(logits, dim=1)
+
+
+class Interrupted(Exception):
+    pass
+
+
+@pytest.fixture
+def checkpoint(tmp_path):
+    path = str(tmp_path / 'stub.pt')
+    torch.jit.script(StubModel()).save(path)
+    return path
+
+
+def brightness(i):
+    return i * 25 % 256
+
+
+def expected_label(path):
+    '''
+    make_images로 만든 이미지에 대해 StubModel이 예측해야 하는 class
+    '''
+
+    i = int(os.path.splitext(os.path.basename(path))[0])
+    return int(np.argmin(np.abs(brightness(i) / 255 * 9 - np.arange(10))))
+
+
+def make_images(root, n):
+    for i in range(n):
+        subdir = os.path.join(root, f'd{i % 3}')
+        os.makedirs(subdir, exist_ok=True)
+        Image.fromarray(np.full((28, 28), brightness(i), dtype=np.uint8)).save(
+            os.path.join(subdir, f'{i:03d}.png'))
+
+
+def read_rows(output):
+    with open(output, newline='', encoding='utf-8', errors='surrogateescape') as f:
+        return list(csv.reader(f))
+
+
+def run(checkpoint, input_dir, output, **kwargs):
+    kwargs.setdefault('batch_size', 4)
+    return batch_predict.predict(checkpoint, str(input_dir), str(output),
+                                 n_workers=1, n_slots=2, **kwargs)
+
+
+def test_resume_after_interrupt(tmp_path, checkpoint, monkeypatch):
+    input_dir = tmp_path / 'images'
+    make_images(str(input_dir), 10)
+    output = tmp_path / 'out.csv'
+
+    save_manifest = batch_predict.save_manifest
+
+    def save_then_interrupt(*args):
+        save_manifest(*args)
+        raise Interrupted
+
+    monkeypatch.setattr(batch_predict, 'save_manifest', save_then_interrupt)
+    with pytest.raises(Interrupted):
+        run(checkpoint, input_dir, output)
+    monkeypatch.setattr(batch_predict, 'save_manifest', save_manifest)
+
+    # 중단 후 기록되었지만 manifest에 반영되지 않은 행은 resume 시 잘려야 함
+    with open(output, 'a') as f:
+        f.write('partial,row\n')
+
+    assert run(checkpoint, input_dir, output, batch_size=3) == 10
+
+    rows = read_rows(output)
+    paths = batch_predict.list_images(os.path.abspath(input_dir))
+    assert rows[0] == batch_predict.CSV_HEADER
+    assert [row[0] for row in rows[1:]] == paths
+    assert all(row[3] == '' for row in rows[1:])
+    # 각 행의 label이 그 경로의 이미지에 대한 예측이어야 함 (slot이나 순서가 섞이지 않았는지 확인)
+    assert [int(row[1]) for row in rows[1:]] == [expected_label(path) for path in paths]
+    assert len({row[1] for row in rows[1:]}) > 1
+
+
+def test_resume_refuses_changed_directory(tmp_path, checkpoint):
+    input_dir = tmp_path / 'images'
+    make_images(str(input_dir), 5)
+    output = tmp_path / 'out.csv'
+    run(checkpoint, input_dir, output)
+
+    Image.fromarray(np.zeros((28, 28), dtype=np.uint8)).save(str(input_dir / 'd0' / 'new.png'))
+    with pytest.raises(ValueError, match='changed'):
+        run(checkpoint, input_dir, output)
+
+    other_dir = tmp_path / 'other'
+    make_images(str(other_dir), 5)
+    with pytest.raises(ValueError, match='input directory'):
+        run(checkpoint, other_dir, output)
+
+
+@pytest.mark.skipif(sys.platform != 'linux', reason='needs byte file names')
+def test_non_utf8_file_name(tmp_path, checkpoint):
+    input_dir = tmp_path / 'images'
+    make_images(str(input_dir), 2)
+    bad_name = os.path.join(os.fsencode(str(input_dir)), b'\xff.png')
+    Image.fromarray(np.zeros((28, 28), dtype=np.uint8)).save(os.fsdecode(bad_name))
+    output = tmp_path / 'out.csv'
+
+    assert run(checkpoint, input_dir, output) == 3
+
+    with open(output, 'rb') as f:
+        assert bad_name in f.read()
+
+
+def test_workers_do_not_import_torch():
+    # spawn된 decode worker는 batch_predict를 다시 import하므로 torch를 import하지 않아야 함
+    code = 'import sys, batch_predict; print("torch" in sys.modules)'
+    result = subprocess.run([sys.executable, '-c', code], capture_output=True, text=True,
+                            cwd=os.path.dirname(os.path.abspath(__file__)), check=True)
+    assert result.stdout.strip() == 'False'
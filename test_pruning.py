@@ -0,0 +1,102 @@
+import pytest
+import torch
+from torch.utils.data import DataLoader, TensorDataset
+
+import models
+import pruning
+
+MODEL_CLASSES = [models.LeNet5_Tanh, models.LeNet5_ReLU, models.LeNet5_LeakyReLU,
+                 models.LeNet5_ParametricReLU, models.LeNet5_ExponentialLinearUnit]
+
+
+@pytest.fixture
+def data_loader():
+    torch.manual_seed(0)
+    X = torch.rand(64, 1, 32, 32)
+    y = torch.randint(0, 10, (64,))
+    return DataLoader(TensorDataset(X, y), batch_size=16)
+
+
+def pruned_layers(model):
+    return [model.feature_extractor[0], model.feature_extractor[3],
+            model.feature_extractor[6], model.classifier[0], model.classifier[2]]
+
+
+@pytest.mark.parametrize('model_class', MODEL_CLASSES)
+@pytest.mark.parametrize('method', ['l1', 'activation'])
+def test_ratio_zero_is_identity(model_class, method, data_loader):
+    torch.manual_seed(0)
+    model = model_class(10).eval()
+    pruned = pruning.prune_lenet5(model, 0.0, method=method, data_loader=data_loader).eval()
+
+    X = torch.rand(8, 1, 32, 32)
+    with torch.no_grad():
+        assert torch.allclose(pruned(X)[0], model(X)[0], atol=1e-6)
+
+
+@pytest.mark.parametrize('model_class', MODEL_CLASSES)
+def test_half_ratio_shapes(model_class):
+    model = model_class(10)
+    pruned = pruning.prune_lenet5(model, 0.5)
+
+    shapes = [tuple(layer.weight.shape[:2]) for layer in pruned_layers(pruned)]
+    assert shapes == [(3, 1), (8, 3), (60, 8), (42, 60), (10, 42)]
+
+    logits, probs = pruned(torch.rand(5, 1, 32, 32))
+    assert logits.shape == probs.shape == (5, 10)
+
+    # 원본 model은 변경되지 않아야 함
+    assert model.feature_extractor[0].out_channels == 6
+
+
+@pytest.mark.parametrize('method', ['l1', 'activation'])
+def test_keeps_top_channels_in_order(method, data_loader):
+    torch.manual_seed(0)
+    model = models.LeNet5_ReLU(10)
+    importances = pruning.get_channel_importance(model, method, data_loader)
+    keep = pruning.select_channels(importances, 0.5)
+
+    for importance, idx in zip(importances, keep):
+        assert idx.tolist() == sorted(idx.tolist())
+        assert set(idx.tolist()) == set(torch.topk(importance, idx.numel()).indices.tolist())
+
+    pruned = pruning.prune_lenet5(model, 0.5, method=method, data_loader=data_loader)
+    original, new = pruned_layers(model), pruned_layers(pruned)
+    in_idx = [None] + keep
+    out_idx = keep + [None]
+    for layer, pruned_layer, i, o in zip(original, new, in_idx, out_idx):
+        weight = layer.weight.detach()
+        bias = layer.bias.detach()
+        if o is not None:
+            weight, bias = weight[o], bias[o]
+        if i is not None:
+            weight = weight[:, i]
+        assert torch.equal(pruned_layer.weight, weight)
+        assert torch.equal(pruned_layer.bias, bias)
+
+
+def test_invalid_arguments(data_loader):
+    model = models.LeNet5_ReLU(10)
+    with pytest.raises(ValueError, match='Unknown importance method'):
+        pruning.prune_lenet5(model, 0.5, method='l2')
+    with pytest.raises(ValueError, match='requires a data_loader'):
+        pruning.prune_lenet5(model, 0.5, method='activation')
+    with pytest.raises(ValueError, match='ratio'):
+        pruning.prune_lenet5(model, 1.0)
+
+    empty = DataLoader(TensorDataset(torch.rand(0, 1, 32, 32), torch.zeros(0)), batch_size=4)
+    with pytest.raises(ValueError, match='no samples'):
+        pruning.get_channel_importance(model, 'activation', empty)
+    with pytest.raises(ValueError, match='no samples'):
+        pruning.get_throughput(model, empty)
+
+
+def test_throughput_times_min_batches():
+    model = models.LeNet5_ReLU(10)
+    calls = []
+    model.register_forward_hook(lambda module, inputs, output: calls.append(inputs[0].size(0)))
+    # batch 1개짜리 data_loader도 반복해서 min_batches만큼 측정해야 함
+    one_batch = DataLoader(TensorDataset(torch.rand(4, 1, 32, 32), torch.zeros(4)), batch_size=4)
+
+    assert pruning.get_throughput(model, one_batch, min_batches=5, min_time=0, n_warmup=2) > 0
+    assert len(calls) == 2 + 5